@@ -1,3 +1,7 @@
+from typing import List
+
+from sqlalchemy import event, insert, text, update
+from sqlalchemy.pool import QueuePool
 from sqlmodel import Session, SQLModel, create_engine, select
 
 from .models import *  # Import models to ensure they are registered with SQLModel
@@ -6,12 +10,70 @@ sqlite_file_name = "database.db"
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
 connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
+# WAL lets pooled connections read concurrently; writes still serialize in SQLite
+engine = create_engine(
+    sqlite_url,
+    connect_args=connect_args,
+    poolclass=QueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+)
+
+
+# WAL lets reads run alongside writes; NORMAL sync is safe with WAL and
+# avoids an fsync on every commit
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+# keeps planner statistics current so the message indexes keep being chosen
+@event.listens_for(engine, "close")
+def optimize_on_close(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA optimize")
+    cursor.close()
 
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
+    # create_all skips tables that already exist, so add indexes to older dbs
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_message_conversation_id "
+                "ON message (conversation_id)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_message_conv_created "
+                "ON message (conversation_id, created_at)"
+            )
+        )
+
+        # same for columns added to existing tables
+        columns = {
+            row[1] for row in conn.execute(text("PRAGMA table_info(conversation)"))
+        }
+        if "history_json" not in columns:
+            conn.execute(text("ALTER TABLE conversation ADD COLUMN history_json JSON"))
+
+        # Gather planner statistics once at startup, PRAGMA optimize keeps them
+        # fresh afterwards. Long-running deployments that delete a lot of
+        # conversations should also run VACUUM periodically (while the app is
+        # stopped) to reclaim free pages.
+        conn.execute(text("ANALYZE"))
+
 
 # seeding db = populating db with initial data
 def seed_db():
@@ -21,62 +83,83 @@ def seed_db():
             return
 
         print("No existing conversations found. Seeding database...")
-        # Conversation 1: General greeting
         conv1 = Conversation(title="Welcome Chat")
-        msg1_1 = Message(role="user", content="Hello, who are you?", conversation=conv1)
+        conv2 = Conversation(title="Python Help")
+        session.add_all([conv1, conv2])
+        # flush to get conversation ids for the messages below
+        session.flush()
+
+        # Conversation 1: General greeting
+        msg1_1 = Message(
+            role="user", content="Hello, who are you?", conversation_id=conv1.id
+        )
         msg1_2 = Message(
             role="assistant",
             content="I am an AI assistant here to help you with your onboarding.",
-            conversation=conv1,
+            conversation_id=conv1.id,
         )
         msg1_3 = Message(
             role="user",
             content="Great, what should I do first?",
-            conversation=conv1,
+            conversation_id=conv1.id,
         )
         msg1_4 = Message(
             role="assistant",
             content="You should start by exploring the documentation.",
-            conversation=conv1,
+            conversation_id=conv1.id,
         )
 
         # Conversation 2: Technical question
-        conv2 = Conversation(title="Python Help")
         msg2_1 = Message(
             role="user",
             content="How do I create a list in Python?",
-            conversation=conv2,
+            conversation_id=conv2.id,
         )
         msg2_2 = Message(
             role="assistant",
             content="You can create a list using square brackets, like this: `my_list = [1, 2, 3]`.",
-            conversation=conv2,
+            conversation_id=conv2.id,
         )
         msg2_3 = Message(
             role="user",
             content="Can I store different types in it?",
-            conversation=conv2,
+            conversation_id=conv2.id,
         )
         msg2_4 = Message(
             role="assistant",
             content="Yes, Python lists can contain elements of different data types.",
-            conversation=conv2,
+            conversation_id=conv2.id,
         )
 
-        session.add(conv1)
-        session.add(conv2)
-        session.add(msg1_1)
-        session.add(msg1_2)
-        session.add(msg1_3)
-        session.add(msg1_4)
-        session.add(msg2_1)
-        session.add(msg2_2)
-        session.add(msg2_3)
-        session.add(msg2_4)
-
+        # everything is written in the single transaction below
+        bulk_create_messages(
+            session,
+            [msg1_1, msg1_2, msg1_3, msg1_4, msg2_1, msg2_2, msg2_3, msg2_4],
+        )
         session.commit()
 
 
+# inserts many messages with one executemany instead of a statement per row;
+# the passed objects are not added to the session
+def bulk_create_messages(session: Session, messages: List[Message]) -> None:
+    if not messages:
+        return
+    session.exec(
+        insert(Message),
+        params=[m.model_dump(exclude={"id"}) for m in messages],
+    )
+
+    # drop the cached LLM windows of the affected conversations in the same
+    # transaction, so the next turn rebuilds them from the message table
+    conversation_ids = {m.conversation_id for m in messages} - {None}
+    if conversation_ids:
+        session.exec(
+            update(Conversation)
+            .where(Conversation.id.in_(conversation_ids))
+            .values(history_json=[])
+        )
+
+
 def get_session():
     with Session(engine) as session:
         yield session
@@ -1,31 +1,64 @@
+import json
 import os
-from typing import Any, List
+from hashlib import blake2b
+from typing import Any, AsyncIterator, List, Optional
 
+import httpx
+from cachetools import TTLCache
 from dotenv import load_dotenv  # type: ignore
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize OpenAI client for NRP
-client = OpenAI(
+# Initialize OpenAI client for NRP, shared by all requests so pooled HTTP/2
+# connections (and their TLS sessions) are reused once warm
+client = AsyncOpenAI(
     api_key=os.environ.get("NRP_API_KEY"),
     base_url="https://ellm.nrp-nautilus.io/v1",
+    max_retries=2,
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=httpx.Timeout(60, connect=5),
+    ),
 )
 
+# Number of most recent messages sent to the LLM as context, at least the
+# previous reply plus the incoming message
+HISTORY_WINDOW = max(int(os.environ.get("LLM_HISTORY_WINDOW", "20")), 2)
 
-def generate_llm_response(messages: List[dict[str, Any]], model: str = "gemma3") -> str:
+# Recent responses keyed by a hash of the model and the exact history sent
+_response_cache: TTLCache[str, str] = TTLCache(maxsize=1024, ttl=3600)
+
+
+def _cache_key(messages: List[dict[str, Any]], model: str) -> str:
+    payload = json.dumps([model, messages], separators=(",", ":"))
+    return blake2b(payload.encode()).hexdigest()
+
+
+async def generate_llm_response(
+    messages: List[dict[str, Any]], model: str = "gemma3", no_cache: bool = False
+) -> str:
     """
     Generate a response from the LLM given a list of messages.
     Args:
         messages: List of message dictionaries with 'role' and 'content' keys
         model: The model to use for generation (default: "gemma3")
+        no_cache: Skip the response cache and always call the API
     Returns:
         The generated response content as a string
     Raises:
         Exception: If there's an error calling the LLM API
     """
-    completion = client.chat.completions.create(
+    key: Optional[str] = None if no_cache else _cache_key(messages, model)
+    if key is not None:
+        # a single get, the entry can expire between a membership test and a read
+        cached = _response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    completion = await client.chat.completions.create(
         model=model,
         messages=messages,  # type: ignore
     )
@@ -34,4 +67,33 @@ def generate_llm_response(messages: List[dict[str, Any]], model: str = "gemma3")
     if response_content is None:
         raise ValueError("LLM returned empty response")
 
+    if key is not None:
+        _response_cache[key] = response_content
     return response_content
+
+
+async def generate_llm_response_stream(
+    messages: List[dict[str, Any]], model: str = "gemma3"
+) -> AsyncIterator[str]:
+    """
+    Stream a response from the LLM given a list of messages.
+    Args:
+        messages: List of message dictionaries with 'role' and 'content' keys
+        model: The model to use for generation (default: "gemma3")
+    Yields:
+        Content fragments of the response as they are generated
+    Raises:
+        Exception: If there's an error calling the LLM API
+    """
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,  # type: ignore
+        stream=True,
+    )
+
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            yield content
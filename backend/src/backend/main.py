@@ -1,18 +1,28 @@
+import os
 from contextlib import asynccontextmanager
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
-
-from typing import Dict
-
-from .llm import generate_llm_response
-
-
-from .database import create_db_and_tables, get_session, seed_db
-from .models import Conversation, Message
+from .database import create_db_and_tables, engine, get_session, seed_db
+from .llm import (
+    HISTORY_WINDOW,
+    client,
+    generate_llm_response,
+    generate_llm_response_stream,
+)
+from .models import (
+    Conversation,
+    ConversationCreate,
+    ConversationWithMessages,
+    Message,
+)
 
 
 @asynccontextmanager
@@ -20,25 +30,37 @@ async def lifespan(app: FastAPI):
     create_db_and_tables()
     seed_db()
     yield
+    await client.close()
+    # closing pooled connections runs PRAGMA optimize on each
+    engine.dispose()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Frontend origins allowed to call the API, comma separated; defaults to the
+# Vite dev server started by `npm run dev`
+cors_origins = os.environ.get(
+    "CORS_ORIGINS", "http://localhost:8101,http://127.0.0.1:8101"
+).split(",")
 
 # middleware = "middle layer software that connects different apps, dbs, services"
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[origin.strip() for origin in cors_origins if origin.strip()],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # let browsers cache preflight responses for a day
+    max_age=86400,
 )
 
 
 # CRUD functions
 @app.post("/conversations/", response_model=Conversation)
 def create_conversation(
-    conversation: Conversation, session: Session = Depends(get_session)
+    conversation_in: ConversationCreate, session: Session = Depends(get_session)
 ):
+    conversation = Conversation.model_validate(conversation_in)
     session.add(conversation)
     session.commit()
     session.refresh(conversation)
@@ -46,28 +68,33 @@ def create_conversation(
 
 
 @app.get("/conversations/", response_model=List[Conversation])
-def read_conversations(session: Session = Depends(get_session)):
-    conversations = session.exec(select(Conversation)).all()
-
-    # Attach messages
-    for conv in conversations:
-        conv.messages = session.exec(
-            select(Message)
-            .where(Message.conversation_id == conv.id)
-            .order_by(Message.created_at)
-        ).all()
+def read_conversations(
+    limit: int = Query(default=50, ge=1, le=200),
+    before_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+):
+    # Keyset pagination, newest first: pass the last id of a page as
+    # `before_id` to fetch the next one. Messages are not embedded so the
+    # response stays bounded, fetch them per conversation from /messages/.
+    statement = select(Conversation)
+    if before_id is not None:
+        statement = statement.where(Conversation.id < before_id)
+    statement = statement.order_by(Conversation.id.desc()).limit(limit)
 
-    return conversations
+    return session.exec(statement).all()
 
 
-@app.get("/conversations/{conversation_id}", response_model=Conversation)
+@app.get("/conversations/{conversation_id}", response_model=ConversationWithMessages)
 def read_conversation(conversation_id: int, session: Session = Depends(get_session)):
-    conversation = session.get(Conversation, conversation_id)
+    # Load the conversation and its ordered messages up front
+    conversation = session.exec(
+        select(Conversation)
+        .where(Conversation.id == conversation_id)
+        .options(selectinload(Conversation.messages))
+    ).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    # Explicitly load messages
-    session.refresh(conversation, ["messages"])
     return conversation
 
 
@@ -84,74 +111,182 @@ def delete_conversation(conversation_id: int, session: Session = Depends(get_ses
 # read in the messages
 @app.get("/conversations/{conversation_id}/messages/", response_model=List[Message])
 def read_conversation_messages(
-    conversation_id: int, session: Session = Depends(get_session)
+    conversation_id: int,
+    limit: int = Query(default=50, ge=1, le=200),
+    before_id: Optional[int] = None,
+    session: Session = Depends(get_session),
 ):
     conversation = session.get(Conversation, conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
+    # Keyset pagination: the latest `limit` messages older than `before_id`,
+    # pass the first id of a page as `before_id` to fetch the one before it
     statement = select(Message).where(Message.conversation_id == conversation_id)
+    if before_id is not None:
+        statement = statement.where(Message.id < before_id)
+    statement = statement.order_by(Message.id.desc()).limit(limit)
+
     messages = session.exec(statement).all()
-    return messages
+    return list(reversed(messages))
+
+
+def _is_llm_history(value: Any) -> bool:
+    # the cached window is only trusted if it still has the shape we store
+    return isinstance(value, list) and all(
+        isinstance(m, dict)
+        and m.get("role") in ("user", "assistant")
+        and isinstance(m.get("content"), str)
+        for m in value
+    )
+
+
+# blocking DB helpers, run in the threadpool from async routes
+def _recent_history(
+    session: Session, conversation_id: Optional[int], limit: int
+) -> List[Dict[str, str]]:
+    # the most recent stored messages, newest first
+    messages = session.exec(
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.id.desc())
+        .limit(limit)
+    ).all()
+
+    # Convert to LLM API format, oldest first
+    return [{"role": m.role, "content": m.content} for m in reversed(messages)]
+
+
+def _save_turn(
+    session: Session,
+    conversation: Conversation,
+    user_message: Message,
+    assistant_message: Message,
+) -> None:
+    # one transaction for the whole turn, so a user message is never stored
+    # without its reply. Inserting first takes SQLite's write lock, so the
+    # cached window re-read below can't be changed by a concurrent turn
+    # before this one commits.
+    session.add_all([user_message, assistant_message])
+    session.flush()
+    session.add(conversation)
+    session.refresh(conversation)
+
+    cached = conversation.history_json
+    if cached and _is_llm_history(cached):
+        conversation.history_json = [
+            *cached,
+            {"role": user_message.role, "content": user_message.content},
+            {"role": assistant_message.role, "content": assistant_message.content},
+        ][-HISTORY_WINDOW:]
+    else:
+        # nothing usable cached yet, rebuild from the messages just flushed
+        conversation.history_json = _recent_history(
+            session, conversation.id, HISTORY_WINDOW
+        )
+
+    session.commit()
+    session.refresh(user_message)
+    session.refresh(assistant_message)
 
 
-# @app.post("/conversations/{conversation_id}/messages/", response_model=Message)
-# def create_message(
-#     conversation_id: int, message: Message, session: Session = Depends(get_session)
-# ):
-#     conversation = session.get(Conversation, conversation_id)
-#     if not conversation:
-#         raise HTTPException(status_code=404, detail="Conversation not found")
+def _load_history(session: Session, conversation: Conversation) -> List[Dict[str, str]]:
+    # One slot of HISTORY_WINDOW is left for the incoming user message
+    cached = conversation.history_json
+    if cached and _is_llm_history(cached):
+        return list(cached[-(HISTORY_WINDOW - 1) :])
 
-#     message.conversation_id = conversation_id
-#     session.add(message)
-#     session.commit()
-#     session.refresh(message)
-#     return message
+    # Conversations stored before history_json existed have no cached window
+    return _recent_history(session, conversation.id, HISTORY_WINDOW - 1)
+
+
+def _sse(event: str, payload: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(payload).decode()}\n\n"
 
 
 @app.post("/conversations/{conversation_id}/messages/")
-def create_message(
+async def create_message(
     conversation_id: int, message: Message, session: Session = Depends(get_session)
 ) -> Dict[str, Message]:
 
     # Step 1: Validate conversation exists
-    conversation = session.get(Conversation, conversation_id)
+    conversation = await run_in_threadpool(session.get, Conversation, conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    # Step 2: Save USER message first
+    # Step 2: Prepare USER message, it is saved together with the reply
     message.role = "user"
     message.conversation_id = conversation_id
 
-    session.add(message)
-    session.commit()
-    session.refresh(message)
-
-    # Step 3: Collect FULL conversation history from DB
-    messages = session.exec(
-        select(Message)
-        .where(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at)
-    ).all()
+    # Step 3: Collect recent conversation history in LLM API format,
+    # normally straight from the window cached on the conversation
+    history = await run_in_threadpool(_load_history, session, conversation)
+    history.append({"role": message.role, "content": message.content})
 
-    # Step 4: Convert to LLM API format
-    history = [{"role": m.role, "content": m.content} for m in messages]
+    # Hand the connection back to the pool while waiting on the LLM; loaded
+    # objects keep their state and are re-attached when the turn is saved
+    await run_in_threadpool(session.close)
 
-    # Step 5: Call LLM API
+    # Step 4: Call LLM API without blocking the event loop
     try:
-        assistant_text = generate_llm_response(history)
+        assistant_text = await generate_llm_response(history)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    # Step 6: Save ASSISTANT reply
+    # Step 5: Save USER message and ASSISTANT reply in one transaction
     assistant_message = Message(
         role="assistant", content=assistant_text, conversation_id=conversation_id
     )
 
-    session.add(assistant_message)
-    session.commit()
-    session.refresh(assistant_message)
+    await run_in_threadpool(
+        _save_turn, session, conversation, message, assistant_message
+    )
 
-    # Step 7: Return both
+    # Step 6: Return both
     return {"user_message": message, "assistant_message": assistant_message}
+
+
+# streams the assistant reply as server-sent events so the client can render
+# tokens as they arrive: "delta" events carry the tokens, then once both
+# messages are saved a "user_message" and an "assistant_message" event follow;
+# failures end the stream with an "error" event
+@app.post("/conversations/{conversation_id}/messages/stream")
+async def stream_message(
+    conversation_id: int, message: Message, session: Session = Depends(get_session)
+) -> StreamingResponse:
+    conversation = await run_in_threadpool(session.get, Conversation, conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    message.role = "user"
+    message.conversation_id = conversation_id
+
+    history = await run_in_threadpool(_load_history, session, conversation)
+    history.append({"role": message.role, "content": message.content})
+    await run_in_threadpool(session.close)
+
+    async def event_stream() -> AsyncIterator[str]:
+        parts: List[str] = []
+        try:
+            async for token in generate_llm_response_stream(history):
+                parts.append(token)
+                yield _sse("delta", {"content": token})
+            if not parts:
+                raise ValueError("LLM returned empty response")
+
+            assistant_message = Message(
+                role="assistant",
+                content="".join(parts),
+                conversation_id=conversation_id,
+            )
+            await run_in_threadpool(
+                _save_turn, session, conversation, message, assistant_message
+            )
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        yield _sse("user_message", message.model_dump(mode="json"))
+        yield _sse("assistant_message", assistant_message.model_dump(mode="json"))
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -1,23 +1,68 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
+from sqlalchemy import JSON, Column, DateTime, Index, func, text
 from sqlmodel import Field, Relationship, SQLModel
 
+# Timestamps are produced by SQLite in UTC with millisecond resolution. The
+# insert-time default also covers tables created before the column had a
+# server default.
+_NOW_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+
+def _created_at_column() -> Column:
+    return Column(
+        DateTime,
+        default=func.strftime(_NOW_FORMAT, "now"),
+        server_default=text(f"(strftime('{_NOW_FORMAT}', 'now'))"),
+        nullable=False,
+    )
+
 
 # forms structure of each object in the db
 class Conversation(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     title: Optional[str] = Field(default=None)
-    created_at: datetime = Field(default_factory=datetime.now)
+    created_at: Optional[datetime] = Field(default=None, sa_column=_created_at_column())
+    # rolling window of recent messages in LLM API format, updated with each
+    # turn so the LLM context doesn't have to be rebuilt from the message table
+    history_json: List[Dict[str, str]] = Field(
+        default_factory=list, sa_column=Column(JSON), exclude=True
+    )
 
-    messages: List["Message"] = Relationship(back_populates="conversation")
+    messages: List["Message"] = Relationship(
+        back_populates="conversation",
+        # id order is insertion order, older rows stored local time rather than
+        # UTC so their created_at values can't be compared with newer ones
+        sa_relationship_kwargs={"order_by": "Message.id"},
+    )
 
 
 class Message(SQLModel, table=True):
+    # covers time-range lookups within a conversation
+    __table_args__ = (
+        Index("ix_message_conv_created", "conversation_id", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    conversation_id: Optional[int] = Field(default=None, foreign_key="conversation.id")
+    conversation_id: Optional[int] = Field(
+        default=None, foreign_key="conversation.id", index=True
+    )
     content: str
     role: str
-    created_at: datetime = Field(default_factory=datetime.now)
+    created_at: Optional[datetime] = Field(default=None, sa_column=_created_at_column())
 
     conversation: Optional[Conversation] = Relationship(back_populates="messages")
+
+
+# request body for creating a conversation, only the fields clients may set
+class ConversationCreate(SQLModel):
+    title: Optional[str] = None
+
+
+# response shape for conversations with their messages eagerly loaded
+class ConversationWithMessages(SQLModel):
+    id: int
+    title: Optional[str] = None
+    created_at: datetime
+    messages: List[Message] = []
@@ -15,44 +15,29 @@ type Conversation = {
   title: string;
   created_at?: string;
   messages: Message[];
+  // whether older messages can still be fetched from the backend
+  hasMoreMessages?: boolean;
 };
 
+// Matches the backend's default page size for conversations and messages
+const PAGE_SIZE = 50;
+
 // Backend API functions
 const api = {
-  async getConversations(): Promise<Conversation[]> {
+  // Conversations come newest first; pass the last id of a page as beforeId
+  // to fetch the next one. Messages are loaded when a conversation is opened.
+  async getConversations(beforeId?: number): Promise<Conversation[]> {
     try {
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+      if (beforeId !== undefined) params.set('before_id', String(beforeId));
+
       const response = await fetch(
-        `${import.meta.env.VITE_API_BASE_URL}/conversations/`,
+        `${import.meta.env.VITE_API_BASE_URL}/conversations/?${params}`,
       );
 
       if (!response.ok) return [];
-      const conversations = await response.json();
-
-      // Fetch messages for each conversation since backend doesn't include them
-      const conversationsWithMessages = await Promise.all(
-        conversations.map(async (conv: any) => {
-          try {
-            const messagesResponse = await fetch(
-              `${import.meta.env.VITE_API_BASE_URL}/conversations/${
-                conv.id
-              }/messages/`,
-            );
-
-            if (messagesResponse.ok) {
-              const messages = await messagesResponse.json();
-              return { ...conv, messages };
-            }
-          } catch (error) {
-            console.error(
-              `Error fetching messages for conversation ${conv.id}:`,
-              error,
-            );
-          }
-          return { ...conv, messages: [] };
-        }),
-      );
-
-      return conversationsWithMessages;
+      const conversations: Conversation[] = await response.json();
+      return conversations.map((conv) => ({ ...conv, messages: [] }));
     } catch (error) {
       console.error('Error fetching conversations:', error);
       return [];
@@ -114,26 +99,22 @@ const api = {
     return response.json();
   },
 
-  async getConversationWithMessages(
+  // Returns the latest page of messages, oldest first; pass the id of the
+  // first loaded message as beforeId to fetch the page before it
+  async getMessages(
     conversationId: number,
-  ): Promise<Conversation> {
-    // Get conversation
-    const convResponse = await fetch(
-      `${import.meta.env.VITE_API_BASE_URL}/conversations/${conversationId}`,
-    );
-    if (!convResponse.ok) throw new Error('Failed to fetch conversation');
-    const conversation = await convResponse.json();
+    beforeId?: number,
+  ): Promise<Message[]> {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (beforeId !== undefined) params.set('before_id', String(beforeId));
 
-    // Get messages
-    const messagesResponse = await fetch(
+    const response = await fetch(
       `${
         import.meta.env.VITE_API_BASE_URL
-      }/conversations/${conversationId}/messages/`,
+      }/conversations/${conversationId}/messages/?${params}`,
     );
-
-    const messages = messagesResponse.ok ? await messagesResponse.json() : [];
-
-    return { ...conversation, messages };
+    if (!response.ok) throw new Error('Failed to fetch messages');
+    return response.json();
   },
 };
 
@@ -144,6 +125,7 @@ function App() {
     number | null
   >(null);
   const [isSending, setIsSending] = useState(false);
+  const [hasMoreConversations, setHasMoreConversations] = useState(false);
 
   const activeConversation = conversations.find(
     (c) => c.id === activeConversationId,
@@ -155,6 +137,7 @@ function App() {
       try {
         const data = await api.getConversations();
         setConversations(data || []);
+        setHasMoreConversations(data.length === PAGE_SIZE);
       } catch (error) {
         console.error('Error loading conversations:', error);
         setConversations([]);
@@ -197,13 +180,14 @@ function App() {
 
         const { assistant_message } = response;
 
-        // Append assistant message to conversation
+        // Add the new conversation at the top, conversations are newest first
         setConversations((prev) => [
-          ...prev,
           {
             ...newConversation,
             messages: [tempUserMessage, assistant_message],
+            hasMoreMessages: false,
           },
+          ...prev,
         ]);
         setActiveConversationId(newConversation.id);
       } catch (error) {
@@ -246,11 +230,17 @@ function App() {
 
   const handleConversationClick = async (conversationId: number) => {
     try {
-      const fullConversation = await api.getConversationWithMessages(
-        conversationId,
-      );
+      const messages = await api.getMessages(conversationId);
       setConversations((prev) =>
-        prev.map((c) => (c.id === conversationId ? fullConversation : c)),
+        prev.map((c) =>
+          c.id === conversationId
+            ? {
+                ...c,
+                messages,
+                hasMoreMessages: messages.length === PAGE_SIZE,
+              }
+            : c,
+        ),
       );
       setActiveConversationId(conversationId);
     } catch (error) {
@@ -258,6 +248,36 @@ function App() {
     }
   };
 
+  const handleLoadOlderMessages = async () => {
+    if (!activeConversation) return;
+    const conversationId = activeConversation.id;
+    const oldestId = activeConversation.messages[0]?.id;
+
+    try {
+      const older = await api.getMessages(conversationId, oldestId);
+      setConversations((prev) =>
+        prev.map((c) =>
+          c.id === conversationId
+            ? {
+                ...c,
+                messages: [...older, ...c.messages],
+                hasMoreMessages: older.length === PAGE_SIZE,
+              }
+            : c,
+        ),
+      );
+    } catch (error) {
+      console.error('Error loading older messages:', error);
+    }
+  };
+
+  const handleLoadOlderConversations = async () => {
+    const oldestId = conversations[conversations.length - 1]?.id;
+    const older = await api.getConversations(oldestId);
+    setConversations((prev) => [...prev, ...older]);
+    setHasMoreConversations(older.length === PAGE_SIZE);
+  };
+
   return (
     <div className="flex h-screen bg-gray-100">
       {/* Sidebar */}
@@ -288,6 +308,14 @@ function App() {
                   {c.title}
                 </div>
               ))}
+            {hasMoreConversations && (
+              <button
+                className="w-full p-2 text-sm text-gray-400 hover:text-white text-left"
+                onClick={handleLoadOlderConversations}
+              >
+                Load older chats
+              </button>
+            )}
           </div>
         </div>
       </div>
@@ -296,10 +324,22 @@ function App() {
       <div className="flex-1 flex flex-col">
         {/* Messages Area */}
         <div className="flex-1 overflow-y-auto p-4 space-y-4">
+          {activeConversation?.hasMoreMessages && (
+            <div className="text-center">
+              <button
+                className="text-sm text-blue-500 hover:underline"
+                onClick={handleLoadOlderMessages}
+              >
+                Load earlier messages
+              </button>
+            </div>
+          )}
+
+          {/* Older pages are prepended, so key by id where there is one */}
           {activeConversation?.messages &&
             activeConversation.messages.map((msg, index) => (
               <div
-                key={index}
+                key={msg.id ?? `pending-${index}`}
                 className={`flex ${
                   msg.role === 'user' ? 'justify-end' : 'justify-start'
                 }`}